@@ -1,3 +1,5 @@
+import asyncio
+import httpx
 import requests
 from flask import Flask, render_template, request, jsonify, redirect, url_for
 # Remove direct stix2/taxii2client imports if only used in TAXIIClient
@@ -5,11 +7,28 @@ from flask import Flask, render_template, request, jsonify, redirect, url_for
 # from taxii2client import Server, Collection
 from taxii2client import Server # Keep for API Root discovery
 
-from taxii_client import TAXIIClient
+from taxii_client import TAXIIClient, mount_http_adapter
+import hashlib
 import json
 import os
+import pickle
+import re
+import sys
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
 import logging # Add logging
+import threading
+import zstandard
+from cachetools import TTLCache
+
+# Prefer orjson for the feeds/indicators files, fall back to stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Import Config
 from config import Config
@@ -23,13 +42,148 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %
 # Initialize TAXII Client (not needed globally anymore, created per feed)
 # taxii_client = TAXIIClient() # Remove this
 
+class _ClosingTTLCache(TTLCache):
+    """TTLCache that closes the Server/TAXIIClient it drops, releasing their sessions."""
+
+    def popitem(self):
+        key, value = super().popitem()
+        _close_quietly(value)
+        return key, value
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for _, value in expired or ():
+            _close_quietly(value)
+        return expired
+
+
+def _close_quietly(value):
+    close = getattr(value, 'close', None)
+    if close is not None:
+        try:
+            close()
+        except Exception as e:
+            logging.warning(f"Error closing evicted TAXII client: {e}")
+
+
+# Server / TAXIIClient objects are reused between requests so their discovery
+# results aren't fetched again on every hit. Shared with the worker threads.
+_client_cache = _ClosingTTLCache(maxsize=64, ttl=300)
+_client_cache_lock = threading.Lock()
+
+
+def _credentials_key(username, password):
+    """Digest of the credentials, so the cache keys never hold a plaintext password."""
+    return hashlib.sha256(f"{username}\0{password}".encode('utf-8')).hexdigest()
+
+
+def get_server(server_url, username=None, password=None):
+    key = ('server', server_url, _credentials_key(username, password))
+    with _client_cache_lock:
+        server = _client_cache.get(key)
+        if server is None:
+            server = Server(server_url, user=username, password=password)
+            # taxii2client keeps its own requests.Session; give it the pooled adapter too
+            mount_http_adapter(server._conn.session)
+            _client_cache[key] = server
+    return server
+
+
+def get_client(api_root_url, collection_title=None, username=None, password=None):
+    key = ('client', api_root_url, collection_title, _credentials_key(username, password))
+    with _client_cache_lock:
+        client = _client_cache.get(key)
+        if client is None:
+            client = TAXIIClient(api_root_url, collection_title, username, password,
+                                 http_cache_dir=app.config['TAXII_HTTP_CACHE_DIR'])
+            _client_cache[key] = client
+    return client
+
+
+def _json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj, indent=True):
+    # Returns bytes in both cases so files can be written in binary mode
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+
+# Serializes writers within a process
+_write_lock = threading.Lock()
+
+
+def _is_compressed(path):
+    return path.endswith('.zst')
+
+
+def _open_for_read(path):
+    """Open `path` for binary reading, transparently decompressing .zst files."""
+    f = open(path, 'rb')
+    if _is_compressed(path):
+        return zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+    return f
+
+
+def _write_atomic(path, data):
+    """Write to a temp file then rename it over `path`, so readers never see a partial file.
+
+    Paths ending in .zst are zstd-compressed.
+    """
+    if _is_compressed(path):
+        data = zstandard.ZstdCompressor(level=3).compress(data)
+    # No fsync: losing the last write on a crash is fine, a truncated file is not.
+    # The pid keeps gunicorn workers from sharing a temp file; the lock covers threads.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with _write_lock:
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+# Parsed files keyed by path -> ((mtime_ns, size), data). Saves always replace the
+# file, which bumps its mtime, so an unchanged stamp means unchanged content.
+_load_cache = {}
+_load_cache_lock = threading.Lock()
+
+
+def _parse_ndjson(content):
+    return [_json_loads(line) for line in content.splitlines() if line.strip()]
+
+
+def _cached_load(path, parse=_json_loads):
+    """Parse a JSON (or, with parse=_parse_ndjson, NDJSON) file, reusing the previous result while the file is unchanged."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _load_cache_lock:
+        cached = _load_cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with _open_for_read(path) as f:
+        # Handle empty file case
+        content = f.read()
+    data = parse(content) if content else []
+    with _load_cache_lock:
+        _load_cache[path] = (stamp, data)
+    return data
+
+
 def load_feeds():
     if not os.path.exists(app.config['TAXII_FEEDS_FILE']):
         return []
     try:
-        with open(app.config['TAXII_FEEDS_FILE'], 'r') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
+        # Callers edit and re-save feed entries, so hand out copies of the cached ones
+        return [dict(feed) for feed in _cached_load(app.config['TAXII_FEEDS_FILE'])]
+    except json.JSONDecodeError: # orjson.JSONDecodeError subclasses this
         logging.error(f"Error decoding JSON from {app.config['TAXII_FEEDS_FILE']}")
         return [] # Return empty list on error
     except Exception as e:
@@ -39,24 +193,127 @@ def load_feeds():
 
 def save_feeds(feeds):
     try:
-        with open(app.config['TAXII_FEEDS_FILE'], 'w') as f:
-            json.dump(feeds, f, indent=4) # Add indent for readability
+        _write_atomic(app.config['TAXII_FEEDS_FILE'], _json_dumps(feeds)) # Indented for readability
     except Exception as e:
         logging.error(f"Error saving feeds: {e}")
 
 
-def load_indicators():
-    if not os.path.exists(app.config['INDICATORS_FILE']):
+def _legacy_indicators_file():
+    """Single-file indicators storage used before sharding, read only while no shards exist."""
+    path = app.config['INDICATORS_FILE']
+    if _is_compressed(path) and not os.path.exists(path) and os.path.exists(path[:-len('.zst')]):
+        return path[:-len('.zst')]
+    return path
+
+
+def _shard_path(feed_name):
+    # Sanitized for the filesystem; the hash keeps names like 'a/b' and 'a_b' apart
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', feed_name)[:64]
+    digest = hashlib.sha1(feed_name.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(app.config['INDICATORS_DIR'],
+                        f"{safe_name}-{digest}{app.config['INDICATOR_SHARD_SUFFIX']}")
+
+
+def _shard_paths():
+    """Existing shard files, in the order their rows are concatenated."""
+    indicators_dir = app.config['INDICATORS_DIR']
+    if not os.path.isdir(indicators_dir):
+        return []
+    suffix = app.config['INDICATOR_SHARD_SUFFIX']
+    return sorted(os.path.join(indicators_dir, name) for name in os.listdir(indicators_dir)
+                  if name.endswith(suffix))
+
+
+def _load_shard(path):
+    # Not memoized: the pickle sidecar below is what the hot path reads
+    try:
+        with _open_for_read(path) as f:
+            return _parse_ndjson(f.read())
+    except json.JSONDecodeError: # orjson.JSONDecodeError subclasses this
+        logging.error(f"Error decoding JSON from {path}")
+    except Exception as e:
+        logging.error(f"Error loading indicators from {path}: {e}")
+    return [] # Skip the broken shard, keep the others
+
+
+# Fields with few distinct values repeated across most rows
+INTERNED_FIELDS = ('type', 'source', 'feed_source')
+
+
+def _intern_fields(indicators):
+    """Share one str object per distinct value of INTERNED_FIELDS across all rows."""
+    # Pickle keeps the sharing, so the sidecar loads already deduplicated
+    for row in indicators:
+        for key in INTERNED_FIELDS:
+            value = row.get(key)
+            if type(value) is str:
+                row[key] = sys.intern(value)
+    return indicators
+
+
+def _load_shards(shard_paths):
+    # Shards parse independently (zstd decompression releases the GIL)
+    with ThreadPoolExecutor(max_workers=min(8, len(shard_paths))) as executor:
+        return _intern_fields(list(chain.from_iterable(executor.map(_load_shard, shard_paths))))
+
+
+# First byte of the pickle sidecar; bump it when the stored row format changes
+PICKLE_FORMAT_VERSION = 2
+
+
+def _parse_pickle(content):
+    if content[0] != PICKLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported pickle sidecar version {content[0]}")
+    return pickle.loads(content[1:])
+
+
+def save_pickle_sidecar(indicators, mtime):
+    """Write all indicators as a pickle, which loads far faster than re-parsing the shards.
+
+    `mtime` is the _indicators_mtime() read before the shards were, so a sidecar
+    built from shards that changed while being read never matches again.
+    """
+    try:
+        _write_atomic(app.config['INDICATORS_PICKLE_FILE'],
+                      bytes([PICKLE_FORMAT_VERSION]) + pickle.dumps((mtime, indicators), protocol=5))
+    except Exception as e:
+        logging.error(f"Error saving pickle sidecar: {e}")
+
+
+def _load_pickle_sidecar(mtime):
+    """Indicators from the pickle sidecar, or None if it is missing, unreadable or
+    wasn't built from the shards as of `mtime`."""
+    pickle_file = app.config['INDICATORS_PICKLE_FILE']
+    try:
+        built_from, indicators = _cached_load(pickle_file, parse=_parse_pickle)
+        if built_from != mtime:
+            return None
+        return indicators
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring pickle sidecar {pickle_file}: {e}")
+        return None
+
+
+def _indicator_rows():
+    """All indicators as the cached list shared between callers; don't modify it or its rows."""
+    mtime = _indicators_mtime() # Before reading, so a concurrent save makes the result stale
+    shard_paths = _shard_paths()
+    if shard_paths:
+        indicators = _load_pickle_sidecar(mtime)
+        if indicators is None:
+            indicators = _load_shards(shard_paths)
+            save_pickle_sidecar(indicators, mtime)
+        return indicators
+
+    indicators_file = _legacy_indicators_file()
+    if not os.path.exists(indicators_file):
         return []
     try:
-        with open(app.config['INDICATORS_FILE'], 'r') as f:
-            # Handle empty file case
-            content = f.read()
-            if not content:
-                return []
-            return json.loads(content)
-    except json.JSONDecodeError:
-        logging.error(f"Error decoding JSON from {app.config['INDICATORS_FILE']}")
+        return _cached_load(indicators_file, parse=lambda content: _add_haystacks(_intern_fields(_json_loads(content))))
+    except json.JSONDecodeError: # orjson.JSONDecodeError subclasses this
+        logging.error(f"Error decoding JSON from {indicators_file}")
         # Optionally backup the corrupted file here
         return [] # Return empty list on error
     except Exception as e:
@@ -64,12 +321,120 @@ def load_indicators():
         return []
 
 
-def save_indicators(indicators):
+def load_indicators():
+    # Shallow copy: the list is shared with the cache, its rows are treated as read-only
+    return list(_indicator_rows())
+
+
+# Fields matched by /search, precomputed into one lowercased '_s' string per indicator
+SEARCH_FIELDS = ('value', 'description', 'type', 'feed_source')
+
+
+_get_haystack = itemgetter('_s')
+
+
+def _search_haystack(indicator):
+    # Newline-separated so a query can't match across two fields
+    return '\n'.join(str(indicator.get(k, '')) for k in SEARCH_FIELDS).lower()
+
+
+def _add_haystacks(indicators):
+    """Fill in '_s' on rows stored before the search field existed."""
+    for ind in indicators:
+        if '_s' not in ind:
+            ind['_s'] = _search_haystack(ind)
+    return indicators
+
+
+# The search index maps every INDEX_GRAM_LEN-character slice of the tokens below to
+# the rows containing it, so substring queries are answered with dict lookups.
+# Query tokens shorter than a gram can't be looked up and are left to the re-check.
+_TOKEN_RE = re.compile(r'[a-z0-9.:/_-]+')
+INDEX_GRAM_LEN = 3
+
+
+def _token_grams(token):
+    return {token[i:i + INDEX_GRAM_LEN] for i in range(len(token) - INDEX_GRAM_LEN + 1)}
+
+
+def build_index(indicators, mtime):
+    """Map each lowercase trigram of the searchable tokens to the row numbers containing it.
+
+    `mtime` is the _indicators_mtime() read before `indicators` were.
+    """
+    grams = {}
+    for row, ind in enumerate(indicators):
+        haystack = ind.get('_s')
+        if haystack is None:
+            haystack = _search_haystack(ind)
+        row_grams = set()
+        for token in set(_TOKEN_RE.findall(haystack)):
+            row_grams.update(_token_grams(token))
+        for gram in row_grams:
+            grams.setdefault(gram, []).append(row)
+    # Readers only use an index built from the indicators as they are now
+    return {'mtime': mtime, 'count': len(indicators), 'grams': grams}
+
+
+def save_index(search_index):
     try:
-        with open(app.config['INDICATORS_FILE'], 'w') as f:
-            json.dump(indicators, f, indent=4) # Add indent
+        _write_atomic(app.config['INDICATORS_INDEX_FILE'], _json_dumps(search_index, indent=False))
+    except Exception as e:
+        logging.error(f"Error saving search index: {e}")
+
+
+def load_index(indicators, mtime):
+    """Return the search index for `indicators`, read as of _indicators_mtime() `mtime`,
+    rebuilding it if missing or stale."""
+    index_file = app.config['INDICATORS_INDEX_FILE']
+    try:
+        search_index = _cached_load(index_file)
+        if (isinstance(search_index, dict) and 'grams' in search_index
+                and search_index.get('mtime') == mtime
+                and search_index.get('count') == len(indicators)):
+            return search_index
+    except (OSError, ValueError) as e: # ValueError covers JSON decode errors
+        logging.debug(f"Search index unavailable, rebuilding: {e}")
+    search_index = build_index(indicators, mtime)
+    save_index(search_index)
+    return search_index
+
+
+def save_indicators(indicators, changed_feeds=None):
+    """Write indicators as one NDJSON shard per feed_source.
+
+    If `changed_feeds` is given, only those feeds' shards are rewritten; the rest of
+    `indicators` must match what is already on disk. Feeds without a shard yet, or
+    every feed while migrating from the single-file storage, are always written.
+    Shards of feeds with no indicators left are removed. `indicators` is not
+    modified, so it may hold the cached rows of load_indicators().
+    """
+    shards = {}
+    for ind in indicators:
+        row = {**ind, '_s': _search_haystack(ind)} # Copy, the cached rows are shared
+        shards.setdefault(_shard_path(row.get('feed_source', '')), []).append(row)
+    legacy_file = _legacy_indicators_file()
+    # Unchanged feeds still only live in the legacy file, so they must be written out too
+    write_all = changed_feeds is None or os.path.exists(legacy_file)
+    try:
+        os.makedirs(app.config['INDICATORS_DIR'], exist_ok=True)
+        for path, shard in shards.items():
+            if write_all or shard[0].get('feed_source', '') in changed_feeds or not os.path.exists(path):
+                _write_atomic(path, b''.join(_json_dumps(ind, indent=False) + b'\n' for ind in shard))
+        for path in _shard_paths():
+            if path not in shards:
+                os.remove(path)
+        # Shards supersede the single-file storage, drop it once every shard is written
+        if os.path.exists(legacy_file):
+            os.remove(legacy_file)
     except Exception as e:
         logging.error(f"Error saving indicators: {e}")
+        return
+    # Sidecar and index are built from disk order so row numbers match load_indicators()
+    mtime = _indicators_mtime()
+    ordered = _load_shards(_shard_paths()) if shards else []
+    save_pickle_sidecar(ordered, mtime)
+    save_index(build_index(ordered, mtime))
 
 
 @app.route('/')
@@ -87,31 +452,41 @@ def indicator_details(indicator_id):
     feeds = load_feeds()
     found_indicator = None
 
-    # Search through all feeds for the indicator ID
+    # Search all feeds for the indicator ID concurrently.
     # This assumes indicator IDs are unique across feeds, which might not be true.
     # A better approach might be to store the feed source with the indicator
     # and only query that specific feed.
-    # For now, we query all feeds until found.
-    for feed in feeds:
+    # For now, the first feed that returns the indicator wins.
+    def lookup(feed):
         logging.info(f"Searching for indicator {indicator_id} in feed '{feed['name']}'")
+        # Pass the API Root URL and Collection Title
+        client = get_client(
+            feed['url'], # This is now the API Root URL
+            feed['collection'], # This is the Collection Title
+            feed.get('username'),
+            feed.get('password')
+        )
+        # Call the implemented method in TAXIIClient
+        return client.get_indicator_by_id(indicator_id)
+
+    if feeds:
+        executor = ThreadPoolExecutor(max_workers=min(16, len(feeds)))
+        futures = {executor.submit(lookup, feed): feed for feed in feeds}
         try:
-            # Pass the API Root URL and Collection Title
-            client = TAXIIClient(
-                feed['url'], # This is now the API Root URL
-                feed['collection'], # This is the Collection Title
-                feed.get('username'),
-                feed.get('password')
-            )
-
-            # Call the implemented method in TAXIIClient
-            indicator = client.get_indicator_by_id(indicator_id)
-            if indicator:
-                found_indicator = indicator
-                break # Stop searching once found
-
-        except Exception as e:
-            logging.error(f"Error querying feed '{feed['name']}' for indicator {indicator_id}: {e}")
-            continue # Try next feed
+            for future in as_completed(futures):
+                try:
+                    indicator = future.result()
+                except Exception as e:
+                    logging.error(f"Error querying feed '{futures[future]['name']}' for indicator {indicator_id}: {e}")
+                    continue # Wait for the other feeds
+                if indicator:
+                    found_indicator = indicator
+                    break # Stop searching once found
+        finally:
+            # Drop lookups that haven't started yet; don't wait on the slow ones still running
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
 
     if found_indicator:
          # Check if indicator has 'raw' key from taxii_client
@@ -143,7 +518,7 @@ def discover_api_roots():
 
     try:
         # Use taxii2client Server for discovery endpoint
-        server = Server(server_url, user=username, password=password) # Specify version
+        server = get_server(server_url, username, password) # Cached, discovery runs once per TTL
         # The server's discovery endpoint is /taxii2/
         # Server() might try /taxii/ first, then /taxii2/. Check taxii2client docs if issues.
         logging.debug("Attempting to discover API roots...")
@@ -211,6 +586,7 @@ def add_feed():
     feeds = load_feeds()
     feeds.append(feed_data)
     save_feeds(feeds)
+    _do_search.cache_clear()
     logging.info(f"Added new feed: {feed_data['name']}")
 
     return redirect(url_for('index'))
@@ -223,47 +599,110 @@ def delete_feed(feed_id):
         deleted_feed_name = feeds[feed_id].get('name', 'Unknown')
         feeds.pop(feed_id)
         save_feeds(feeds)
+        _do_search.cache_clear()
         logging.info(f"Deleted feed: {deleted_feed_name} (Index: {feed_id})")
     else:
         logging.warning(f"Attempted to delete invalid feed index: {feed_id}")
     return redirect(url_for('index'))
 
 
+async def refresh_all(feeds):
+    """Fetch indicators for every feed concurrently; returns (indicators, date_added_last) or an exception per feed."""
+    async def fetch(feed):
+        logging.info(f"Refreshing feed: {feed.get('name', 'Unknown Feed')}")
+        # Pass API Root URL and Collection Title
+        client = get_client(
+            feed['url'],
+            feed['collection'],
+            feed.get('username'),
+            feed.get('password')
+        )
+        return await client.fetch_indicators(http_client,
+                                             match_type=app.config['TAXII_MATCH_TYPE'],
+                                             added_after=feed.get('last_added'),
+                                             process_parse_min_bytes=app.config['TAXII_PROCESS_PARSE_MIN_BYTES'])
+
+    limits = httpx.Limits(max_connections=64)
+    async with httpx.AsyncClient(http2=True, limits=limits) as http_client:
+        return await asyncio.gather(*(fetch(feed) for feed in feeds), return_exceptions=True)
+
+
+def _feed_key(feed):
+    return (feed.get('name'), feed.get('url'), feed.get('collection'))
+
+
+def _last_added_cursor(indicators):
+    """ISO 8601 timestamp of the newest indicator, the next added_after of servers
+    that don't send X-TAXII-Date-Added-Last."""
+    # 'modified' is stored as 'YYYY-MM-DD HH:MM:SS'; objects from the same second are
+    # fetched again next time and deduplicated by id
+    modified = max((ind.get('modified') or '' for ind in indicators), default='')
+    if not modified:
+        return None
+    return modified.replace(' ', 'T') + 'Z'
+
+
 @app.route('/refresh_feeds', methods=['POST'])
 def refresh_feeds():
     feeds = load_feeds()
-    all_indicators = []
-    total_fetched = 0
     errors = []
 
+    # Previously fetched indicators per feed, keyed by id for deduplication.
+    # Indicators of feeds that no longer exist are dropped. These are the shared
+    # cached rows: fetched indicators replace them in the dict, never update them.
+    stored = {feed.get('name', 'Unknown Feed'): {} for feed in feeds}
+    for ind in load_indicators():
+        if ind.get('feed_source') in stored:
+            stored[ind['feed_source']][ind['id']] = ind
+
     logging.info(f"Starting refresh for {len(feeds)} feeds.")
     for feed in feeds:
+        # Only fetch the delta if we still hold the feed's earlier indicators
+        if not stored[feed.get('name', 'Unknown Feed')]:
+            feed.pop('last_added', None)
+
+    results = []
+    if feeds:
+        # One event loop drives every feed's fetch concurrently
+        results = list(zip(feeds, asyncio.run(refresh_all(feeds))))
+
+    cursors = {}
+    changed_feeds = set()
+    for feed, result in results:
         feed_name = feed.get('name', 'Unknown Feed')
-        logging.info(f"Refreshing feed: {feed_name}")
-        try:
-            # Pass API Root URL and Collection Title
-            client = TAXIIClient(
-                feed['url'],
-                feed['collection'],
-                feed.get('username'),
-                feed.get('password')
-            )
-            indicators = client.get_indicators()
-            logging.info(f"Fetched {len(indicators)} indicators from feed: {feed_name}")
-            # Add source feed name to each indicator for clarity
-            for ind in indicators:
-                ind['feed_source'] = feed_name
-            all_indicators.extend(indicators)
-            total_fetched += len(indicators)
-        except Exception as e:
-            error_msg = f"Error fetching from feed '{feed_name}': {str(e)}"
-            logging.exception(f"Error refreshing feed '{feed_name}'") # Log full traceback
-            errors.append(error_msg)
-
-    # Overwrite existing indicators file with the latest fetch
-    save_indicators(all_indicators)
+        if isinstance(result, Exception):
+            # Keep the feed's previously fetched indicators
+            logging.error(f"Error refreshing feed '{feed_name}'", exc_info=result) # Log full traceback
+            errors.append(f"Error fetching from feed '{feed_name}': {str(result)}")
+            continue
+        result, date_added_last = result
+        logging.info(f"Fetched {len(result)} new/updated indicators from feed: {feed_name}")
+        # Add source feed name to each indicator for clarity
+        for ind in result:
+            ind['feed_source'] = feed_name
+            stored[feed_name][ind['id']] = ind
+        if result:
+            changed_feeds.add(feed_name)
+        # added_after filters on when the server added objects, which the server's
+        # X-TAXII-Date-Added-Last reports; an object's 'modified' can be far older
+        cursor = date_added_last
+        if not cursor and result:
+            cursor = _last_added_cursor(stored[feed_name].values())
+        cursors[_feed_key(feed)] = cursor or feed.get('last_added')
+
+    all_indicators = [ind for feed_indicators in stored.values() for ind in feed_indicators.values()]
+    # Only shards of feeds that returned something are rewritten (all of them when migrating)
+    save_indicators(all_indicators, changed_feeds=changed_feeds)
+    _do_search.cache_clear() # mtime in the key already covers this, but be explicit
     logging.info(f"Refresh complete. Total indicators saved: {len(all_indicators)}")
 
+    # Re-read so feeds added or deleted while fetching aren't overwritten
+    current_feeds = load_feeds()
+    for feed in current_feeds:
+        if _feed_key(feed) in cursors:
+            feed['last_added'] = cursors[_feed_key(feed)]
+    save_feeds(current_feeds)
+
     if errors:
          return jsonify({'success': False, 'count': len(all_indicators), 'errors': errors})
     else:
@@ -283,7 +722,7 @@ def discover_collections():
     logging.info(f"Discovering collections for API Root: {api_root_url}")
     try:
         # Use our client which expects the API Root URL
-        client = TAXIIClient(api_root_url, None, username, password)
+        client = get_client(api_root_url, None, username, password)
         collections = client.discover_collections() # This now uses requests
         if collections:
              logging.info(f"Discovered {len(collections)} collections.")
@@ -301,24 +740,78 @@ def discover_collections():
         return jsonify({"success": False, "error": f"An unexpected error occurred: {str(e)}"})
 
 
+def _indicators_mtime():
+    try:
+        # Replacing or removing a shard updates the directory's mtime
+        return os.stat(app.config['INDICATORS_DIR']).st_mtime_ns
+    except OSError:
+        pass
+    try:
+        return os.stat(_legacy_indicators_file()).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _index_candidates(query):
+    """Row numbers that may match `query` according to the trigram index, or None to scan everything."""
+    # A row containing the query contains every trigram of every query token
+    query_grams = set()
+    for token in _TOKEN_RE.findall(query):
+        query_grams.update(_token_grams(token))
+    if not query_grams:
+        return None # Only tokens shorter than a trigram
+    mtime = _indicators_mtime() # Before the rows, as _indicator_rows() does
+    indicators = _indicator_rows()
+    grams = load_index(indicators, mtime)['grams']
+    postings = sorted((grams.get(gram, ()) for gram in query_grams), key=len)
+    if not postings[0]:
+        return []
+    rows = set(postings[0])
+    for gram_rows in postings[1:]:
+        rows.intersection_update(gram_rows)
+        if not rows:
+            return []
+    return sorted(rows)
+
+
+@lru_cache(maxsize=32)
+def _do_search(query, type_filter, mtime):
+    """Row numbers in _indicator_rows() of the indicators matching the search."""
+    # mtime is only part of the cache key, so rewriting the indicators file
+    # automatically stops old results from being returned
+    indicators = _indicator_rows()
+    candidates = _index_candidates(query)
+    if candidates is None:
+        candidates = range(len(indicators))
+    if type_filter:
+        candidates = (row for row in candidates if str(indicators[row].get('type', '')).lower() == type_filter)
+    # Candidates are re-checked so results are exactly those of a full substring scan.
+    # Row numbers rather than rows, so cached results don't pin old indicator lists.
+    return tuple([row for row in candidates if query in _get_haystack(indicators[row])])
+
+
+# mtime of the indicators the cached search results refer to
+_search_mtime = None
+
+
 @app.route('/search', methods=['GET'])
 def search():
     query = request.args.get('q', '').lower()
-    indicators = load_indicators()
+    type_filter = request.args.get('type', '').lower() # Optional exact match on indicator type
     feeds = load_feeds()
 
-    if query:
-        logging.info(f"Searching indicators for query: '{query}'")
-        filtered_indicators = []
-        for indicator in indicators:
-            if (query in str(indicator.get('value', '')).lower() or
-                    query in str(indicator.get('description', '')).lower() or
-                    query in str(indicator.get('type', '')).lower() or
-                    query in str(indicator.get('feed_source', '')).lower()):
-                filtered_indicators.append(indicator)
-        indicators = filtered_indicators
+    if query or type_filter:
+        logging.info(f"Searching indicators for query: '{query}' (type: '{type_filter}')")
+        global _search_mtime
+        mtime = _indicators_mtime()
+        if mtime != _search_mtime:
+            _do_search.cache_clear() # Results for older indicators can't be hit again
+            _search_mtime = mtime
+        rows = _indicator_rows()
+        indicators = [rows[row] for row in _do_search(query, type_filter, mtime) if row < len(rows)]
         logging.info(f"Found {len(indicators)} matching indicators.")
     else:
+        indicators = load_indicators()
         logging.info("Displaying all indicators (no search query).")
 
     current_year = datetime.now().year # <<< Get the current year
@@ -333,7 +826,8 @@ def search():
 if __name__ == '__main__':
     if not os.path.exists(app.config['TAXII_FEEDS_FILE']):
         save_feeds([])
-    if not os.path.exists(app.config['INDICATORS_FILE']):
+    if not _shard_paths() and not os.path.exists(_legacy_indicators_file()):
         save_indicators([])
     logging.info("Starting Flask application...")
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Development server only, use the gunicorn entrypoint in Procfile for deployments
+    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -3,4 +3,17 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-123'
     TAXII_FEEDS_FILE = 'taxii_feeds.json'
-    INDICATORS_FILE = 'indicators.json'
+    INDICATORS_DIR = 'indicators' # One NDJSON shard per feed
+    INDICATOR_SHARD_SUFFIX = '.jsonl.zst' # zstd-compressed; use '.jsonl' to store shards uncompressed
+    INDICATORS_FILE = 'indicators.json.zst' # Single-file storage from before sharding, read until the first save
+    INDICATORS_PICKLE_FILE = 'indicators.pkl' # Fast-loading copy of all shards, regenerated on save
+    INDICATORS_INDEX_FILE = 'indicators.idx' # Token index for /search, rebuilt with the shards
+    # Server-side match[type] filter for refreshes (e.g. 'indicator'). Leave unset for
+    # servers that store indicators inside bundles, which such a filter would exclude.
+    TAXII_MATCH_TYPE = os.environ.get('TAXII_MATCH_TYPE') or None
+    # Opt-in on-disk HTTP cache for the TAXII client's requests session (needs cachecontrol),
+    # e.g. '.taxii_cache'. Holds authenticated responses in plain files, one directory per credential.
+    TAXII_HTTP_CACHE_DIR = os.environ.get('TAXII_HTTP_CACHE_DIR') or None
+    # Opt-in: refreshes parse TAXII pages of at least this many bytes (e.g. 1048576)
+    # in a small pool of spawned worker processes. Unset parses every page in place.
+    TAXII_PROCESS_PARSE_MIN_BYTES = int(os.environ.get('TAXII_PROCESS_PARSE_MIN_BYTES') or 0) or None
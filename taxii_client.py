@@ -1,47 +1,334 @@
+import asyncio
+import atexit
+import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import requests
-from requests.auth import HTTPBasicAuth
-from stix2 import parse, Filter, Bundle # Added Bundle
-from taxii2client import Server # Keep Server for discovery if needed elsewhere, but requests is primary now
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+from stix2 import parse, Bundle # Added Bundle
+from datetime import datetime, timezone
 import json # For potential error parsing
+import logging
+import multiprocessing
+import os
+import ijson
+from ijson.common import ObjectBuilder
+import threading
+import time
+from urllib.parse import urlencode
+from cachetools import TTLCache
+from email.utils import format_datetime
+
+# Optional on-disk HTTP cache (see TAXIIClient's http_cache_dir): unchanged pages come
+# back as 304s and are served from disk
+try:
+    from cachecontrol import CacheControlAdapter
+    from cachecontrol.caches.file_cache import FileCache
+except ImportError:
+    CacheControlAdapter = None
+
+# Faster JSON decoding for response bodies; stdlib json stays for the pretty error prints
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# C-accelerated ijson backend when yajl is available, pure Python otherwise
+try:
+    _ijson_backend = ijson.get_backend('yajl2_c')
+except ImportError:
+    _ijson_backend = ijson
 
 # Define the required TAXII media type
 TAXII_MEDIA_TYPE = "application/taxii+json;version=2.1"
 
+
+# (connect, read) seconds for every request made through a TAXIIClient session
+REQUEST_TIMEOUT = (5, 30)
+# Longest Retry-After wait honoured, sync and async, so a request thread is never held for hours
+MAX_RETRY_AFTER = 60 # Seconds
+
+logger = logging.getLogger(__name__)
+
+
+class LoggingRetry(Retry):
+    """Retry policy that logs each retried request at DEBUG level."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        reason = error or (response.status if response is not None else None)
+        logger.debug("Retrying %s %s after %s (%s)", method, url, reason, new_retry)
+        return new_retry
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER)
+
+
+def build_retry():
+    """Shared retry policy: transient errors and rate limits, honouring Retry-After up to MAX_RETRY_AFTER."""
+    return LoggingRetry(total=5, connect=3, read=3, backoff_factor=0.5,
+                        status_forcelist=(429, 500, 502, 503, 504),
+                        respect_retry_after_header=True, allowed_methods=frozenset(['GET']))
+
+
+def build_http_adapter(cache_dir=None):
+    """Keep-alive connection pool with the build_retry() policy.
+
+    With cache_dir set and cachecontrol installed, responses are also cached in
+    cache_dir and revalidated with their ETag/Last-Modified. The cache is keyed by
+    URL only, so give each set of credentials its own directory.
+    """
+    retry = build_retry()
+    if cache_dir and CacheControlAdapter is not None:
+        # FileCache writes its entries 0600
+        return CacheControlAdapter(cache=FileCache(cache_dir),
+                                   pool_connections=32, pool_maxsize=32, max_retries=retry)
+    return HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry)
+
+
+def mount_http_adapter(session, cache_dir=None):
+    adapter = build_http_adapter(cache_dir)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# Pages fetch_indicators keeps in flight ahead of the one being parsed
+PREFETCH_PAGES = 8
+# 429 responses fetch_indicators waits out before giving up on a page
+MAX_RATE_LIMIT_RETRIES = 5
+# ijson prefixes of the STIX objects/bundles in a flat and a nested envelope
+ENVELOPE_ITEM_PREFIXES = ('objects.item', 'objects.item.item')
+# get_indicators_by_ids: keep each match[id] URL under common server/proxy limits
+MATCH_ID_URL_BUDGET = 1500
+ID_BATCH_WORKERS = 4
+# Collections get_all_indicators pages at the same time
+COLLECTION_FETCH_WORKERS = 8
+# Worker processes fetch_indicators may parse large pages in (see its process_parse_min_bytes)
+PROCESS_PARSE_MAX_WORKERS = 4
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+# (output key, STIX attribute, default when missing) for the timestamps of a simplified indicator.
+# 'valid_from' is shown as 'first_seen'.
+INDICATOR_TIMESTAMP_FIELDS = (
+    ('first_seen', 'valid_from', 'N/A'),
+    ('last_seen', 'last_seen', 'N/A'),
+    ('created', 'created', ''),
+    ('modified', 'modified', ''),
+)
+
+
+def _fmt_ts(timestamp, default='N/A'):
+    """'YYYY-MM-DD HH:MM:SS' for a STIX timestamp, given as its ISO 8601 string or a datetime."""
+    if not timestamp:
+        return default
+    if isinstance(timestamp, str):
+        return timestamp[:10] + ' ' + timestamp[11:19] # Slicing beats parsing and strftime
+    return timestamp.isoformat(sep=' ', timespec='seconds')[:19] # Drops the UTC offset
+
+
+def _taxii_timestamp(value):
+    """added_after value for a query: strings pass through, datetimes become UTC ISO 8601 with 'Z'."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(timespec='milliseconds') + 'Z'
+    return value
+
+
+def _newest_timestamp(timestamps):
+    """Latest of some TAXII timestamp strings (None ignored), compared as instants.
+
+    Compared as strings, '...:35Z' would sort after '...:35.123Z'.
+    """
+    def instant(value):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return datetime.min.replace(tzinfo=timezone.utc) # Unparseable, never picked over a valid one
+    return max((value for value in timestamps if value), key=instant, default=None)
+
+
+def _envelope_items(envelope):
+    """Return the list of STIX objects/bundles carried by a TAXII envelope.
+
+    Servers either list objects directly ("objects": [obj, ...]) or wrap the
+    list once more ("objects": [[obj, ...]]). Checking the first item is enough
+    and is redone on every page, whose shape may differ from the last one.
+    """
+    objects = envelope.get('objects') or []
+    if objects and isinstance(objects[0], list):
+        return objects[0]
+    return objects
+
+
+def _project_indicator(item, source):
+    """Fast path: build simplified indicator dicts straight from a raw STIX dict.
+
+    Handles a bundle or a single indicator. Returns None when the item does not
+    look like plain STIX JSON so the caller can fall back to stix2.parse.
+    Module-level so worker processes can run it (see _parse_page_bytes).
+    """
+    if not isinstance(item, dict):
+        return None
+    if item.get('type') == 'bundle':
+        objects = item.get('objects', [])
+        if not isinstance(objects, list):
+            return None
+    else:
+        objects = [item]
+
+    simple_indicators = []
+    for obj in objects:
+        if not isinstance(obj, dict) or obj.get('type') != 'indicator':
+            continue
+        if 'id' not in obj:
+            return None
+        simple = {
+            'id': obj['id'],
+            'type': 'indicator',
+            'value': obj.get('value', obj.get('pattern')),
+            'description': obj.get('description', ''),
+            'source': source
+        }
+        for key, attr, default in INDICATOR_TIMESTAMP_FIELDS:
+            timestamp = obj.get(attr)
+            if timestamp and not (isinstance(timestamp, str) and len(timestamp) >= 19):
+                return None
+            simple[key] = _fmt_ts(timestamp, default)
+        simple_indicators.append(simple)
+    return simple_indicators
+
+
+def _parse_page_bytes(content, source):
+    """Decode one objects page and project its indicators.
+
+    Runs in a worker process for large pages, so it only takes and returns
+    picklable values: a dict with the projected 'indicators', the 'unparsed'
+    items the fast path could not read, the object 'count', and the
+    envelope's 'more' and 'next'.
+    """
+    envelope = _loads(content)
+    objects = _envelope_items(envelope)
+    indicators, unparsed = [], []
+    for item in objects:
+        projected = _project_indicator(item, source)
+        if projected is None:
+            unparsed.append(item)
+        else:
+            indicators.extend(projected)
+    return {'indicators': indicators, 'unparsed': unparsed, 'count': len(objects), 'more': envelope.get('more', False), 'next': envelope.get('next')}
+
+
+def _get_parse_pool():
+    """Process pool for parsing large pages, started on first use."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # Spawned, not forked: forking a threaded web worker
+            # can copy held locks into the children
+            _parse_pool = ProcessPoolExecutor(max_workers=min(PROCESS_PARSE_MAX_WORKERS, os.cpu_count() or 1),
+                                              mp_context=multiprocessing.get_context('spawn'))
+        return _parse_pool
+
+
+@atexit.register
+def _shutdown_parse_pool():
+    """Stop the parse workers with the interpreter."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False) # No cancel_futures, it needs Python 3.9
+            _parse_pool = None
+
+# {collection title: collection ID} per (API Root URL, credential), shared by the clients
+# using them; servers may list different collections to different users
+COLLECTION_ID_TTL = 300 # Seconds
+_collections_cache = TTLCache(maxsize=64, ttl=COLLECTION_ID_TTL)
+_collections_cache_lock = threading.Lock()
+
 class TAXIIClient:
     # Expect the full API Root URL now
-    def __init__(self, api_root_url=None, collection_title=None, username=None, password=None):
+    def __init__(self, api_root_url=None, collection_title=None, username=None, password=None,
+                 http_cache_dir=None):
+        """http_cache_dir opts in to an on-disk HTTP cache (needs cachecontrol), off by default."""
         self.api_root_url = api_root_url.rstrip('/') if api_root_url else None # Ensure no trailing slash
         self.collection_title = collection_title # Store the title provided by the user
         self.username = username
         self.password = password
-        self.auth = HTTPBasicAuth(self.username, self.password) if self.username and self.password else None
+        self.auth = None # Basic credentials travel as a precomputed header instead of a per-request auth hook
         self.headers = {"Accept": TAXII_MEDIA_TYPE}
-
-    def _get_collection_id_by_title(self, title):
-        """Helper to find collection ID based on its title."""
-        if not self.api_root_url:
-            print("Error: API Root URL not configured.")
-            return None
+        if self.username and self.password:
+            token = base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
+            self.headers['Authorization'] = f"Basic {token}"
+
+        # Digest of the credentials, separating what is cached for different users
+        credential = hashlib.sha256(self.headers.get('Authorization', '').encode()).hexdigest()[:16]
+        self._collections_key = (self.api_root_url, credential)
+
+        # Cached responses hold authenticated data: one cache directory per credential,
+        # so a response is never served to a client with other (or no) credentials
+        self._http_cache_dir = None
+        if http_cache_dir and CacheControlAdapter is not None:
+            self._http_cache_dir = os.path.join(http_cache_dir, credential)
+            os.makedirs(self._http_cache_dir, mode=0o700, exist_ok=True) # Owner-only, like the cache files
+
+        # Pooled keep-alive session, so paginated fetches reuse one connection
+        self.session = mount_http_adapter(requests.Session(), self._http_cache_dir)
+        self.session.headers.update(self.headers)
+        # Compressed responses; urllib3 lists br (and zstd) only when it can decode them
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+        # title -> (collection ID, time.monotonic() when resolved); the client is
+        # shared between request threads, so it is only touched under the lock
+        self._collection_id_cache = {}
+        self._collection_id_lock = threading.Lock()
+        self._timeout = REQUEST_TIMEOUT
+
+    def close(self):
+        """Release the pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _collections_index(self, refresh=False):
+        """{title: id} for every collection at the API Root, or None if they can't be listed.
+
+        Shared by the clients with the same API Root and credentials for COLLECTION_ID_TTL seconds.
+        """
+        if not refresh:
+            with _collections_cache_lock:
+                collections_index = _collections_cache.get(self._collections_key)
+            if collections_index is not None:
+                return collections_index
 
         collections_url = f"{self.api_root_url}/collections/"
         try:
-            response = requests.get(collections_url, auth=self.auth, headers=self.headers, timeout=30)
+            response = self.session.get(collections_url, timeout=self._timeout)
             response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-            collections_data = response.json()
+            collections_data = _loads(response.content)
 
             # The server returns a list of collection dicts directly at this endpoint
             # based on src/database/data_handling.py -> get_api_root_collections
-            if isinstance(collections_data, list):
-                 for collection in collections_data:
-                    if collection.get('title') == title:
-                        return collection.get('id')
-            else:
+            if not isinstance(collections_data, list):
                  print(f"Warning: Unexpected format for collections response from {collections_url}. Expected list.")
+                 return None
 
-
-            print(f"Error: Collection with title '{title}' not found at {self.api_root_url}")
-            return None
+            collections_index = {c.get('title'): c.get('id') for c in collections_data}
+            with _collections_cache_lock:
+                _collections_cache[self._collections_key] = collections_index
+            return collections_index
 
         except requests.exceptions.RequestException as e:
             print(f"Error discovering collections at {collections_url}: {str(e)}")
@@ -57,6 +344,55 @@ class TAXIIClient:
             print(f"Response text: {response.text}")
             return None
 
+    def _resolve_collection_id(self):
+        """ID of the configured collection, remembered on this client for COLLECTION_ID_TTL seconds."""
+        with self._collection_id_lock:
+            cached = self._collection_id_cache.get(self.collection_title)
+        if cached and time.monotonic() - cached[1] < COLLECTION_ID_TTL:
+            return cached[0]
+        collection_id = self._get_collection_id_by_title(self.collection_title)
+        if collection_id:
+            with self._collection_id_lock:
+                self._collection_id_cache[self.collection_title] = (collection_id, time.monotonic())
+        return collection_id
+
+    def invalidate_collection_cache(self):
+        """Forget resolved collection IDs so the next call lists the collections again."""
+        with self._collection_id_lock:
+            self._collection_id_cache.clear()
+        with _collections_cache_lock:
+            _collections_cache.pop(self._collections_key, None)
+
+    def _get_collection_id_by_title(self, title):
+        """Helper to find collection ID based on its title.
+
+        Returns None if the collections can't be listed (error printed) and
+        raises ValueError if no collection has this title.
+        """
+        if not self.api_root_url:
+            print("Error: API Root URL not configured.")
+            return None
+
+        collection_ids = self._get_collection_ids_by_titles([title])
+        if collection_ids is None:
+            return None
+        if title not in collection_ids:
+            raise ValueError(f"Collection with title '{title}' not found at {self.api_root_url}")
+        return collection_ids[title]
+
+    def _get_collection_ids_by_titles(self, titles):
+        """{title: id} for the given titles that exist at the API Root, from one collections listing.
+
+        Returns None if the collections can't be listed (error printed).
+        """
+        collections_index = self._collections_index()
+        if collections_index is not None and any(title not in collections_index for title in titles):
+            # The cached list may predate some of the collections, check once more
+            collections_index = self._collections_index(refresh=True)
+        if collections_index is None:
+            return None
+        return {title: collections_index[title] for title in titles if collections_index.get(title)}
+
 
     def discover_collections(self):
         """Discover available collections on the TAXII server's API Root"""
@@ -66,9 +402,9 @@ class TAXIIClient:
 
         collections_url = f"{self.api_root_url}/collections/"
         try:
-            response = requests.get(collections_url, auth=self.auth, headers=self.headers, timeout=30)
+            response = self.session.get(collections_url, timeout=self._timeout)
             response.raise_for_status()
-            collections_data = response.json()
+            collections_data = _loads(response.content)
 
             # Expecting a list of collection dicts
             if isinstance(collections_data, list):
@@ -97,107 +433,193 @@ class TAXIIClient:
             print(f"Response text: {response.text}")
             return []
 
-    def get_indicators(self, simple_indicators=None):
-        """Fetch indicators from the configured collection, handling pagination."""
+    @staticmethod
+    def _objects_url(objects_url_base, page, match_type=None, added_after=None, next_token=None,
+                     match_id=None):
+        """Build a page URL, pushing filters down to the server as TAXII 2.1 query parameters."""
+        params = {'page': page} # Adjust if server uses 0-based page or offset
+        if match_type:
+            params['match[type]'] = match_type
+        if match_id:
+            params['match[id]'] = match_id
+        if added_after:
+            params['added_after'] = _taxii_timestamp(added_after)
+        if next_token:
+            # Spec-compliant servers paginate with the envelope's 'next' value rather than ?page=
+            params['next'] = next_token
+        return f"{objects_url_base}?{urlencode(params, safe='[]:,')}"
+
+    @staticmethod
+    def _if_modified_since(added_after):
+        """If-Modified-Since header for an ISO 8601 added_after watermark, or {} if it can't be read."""
+        if not added_after:
+            return {}
+        try:
+            since = datetime.fromisoformat(_taxii_timestamp(added_after).replace('Z', '+00:00'))
+        except ValueError:
+            return {}
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return {'If-Modified-Since': format_datetime(since.astimezone(timezone.utc), usegmt=True)}
+
+    def _iter_envelope_objects(self, stream, envelope):
+        """Yield each STIX object/bundle of a TAXII envelope as soon as it is parsed.
+
+        Objects of both the flat and the nested envelope shape are picked up,
+        whichever each page uses. The envelope's 'more' and 'next' fields are
+        stored into the envelope dict.
+        """
+        builder = None
+        depth = 0
+        for prefix, event, value in _ijson_backend.parse(stream, use_float=True):
+            if builder is None:
+                # Outside an object, so objects.item.item can only be a nested envelope's object
+                if event == 'start_map' and prefix in ENVELOPE_ITEM_PREFIXES:
+                    builder = ObjectBuilder()
+                    depth = 0
+                elif prefix in ('more', 'next') and event != 'null':
+                    envelope[prefix] = value
+                    continue
+                else:
+                    continue
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+                if depth == 0:
+                    yield builder.value
+                    builder = None
+
+    def _simplify_indicator(self, ind, source=None):
+        """Flatten a parsed STIX indicator into the dict shape stored and displayed by the app."""
+        simple = {
+            'id': ind.id, # Include ID for details link
+            'type': ind.type,
+            # Use pattern for value if value attribute doesn't exist (common for STIX indicators)
+            'value': getattr(ind, 'value', ind.get('pattern')),
+            'description': getattr(ind, 'description', ''),
+            'source': source or self.collection_title # Use title for display
+        }
+        for key, attr, default in INDICATOR_TIMESTAMP_FIELDS:
+            simple[key] = _fmt_ts(getattr(ind, attr, None), default)
+        return simple
+
+    def _indicators_from_items(self, stix_bundles_or_objects, strict=False, source=None):
+        """Convert STIX bundles/objects from one page into simplified indicator dicts.
+
+        Plain STIX dicts are projected directly; strict=True (or an item the fast
+        path cannot read) goes through full stix2 parsing and validation.
+        source is the collection title shown for each indicator (default: this client's).
+        """
+        simple_indicators = []
+        for item in stix_bundles_or_objects:
+            if not strict:
+                projected = _project_indicator(item, source or self.collection_title)
+                if projected is not None:
+                    simple_indicators.extend(projected)
+                    continue
+            try:
+                # Parse the item. It could be a Bundle or a single SDO.
+                stix_object = parse(item, allow_custom=True)
+
+                indicators_in_item = []
+                if isinstance(stix_object, Bundle):
+                    # If it's a bundle, filter for indicators within it
+                    indicators_in_item = [obj for obj in stix_object.objects if obj.get('type') == 'indicator']
+                elif stix_object.get('type') == 'indicator':
+                    # If it's a single indicator object directly
+                    indicators_in_item = [stix_object]
+
+                # Format the found indicators
+                simple_indicators.extend(self._simplify_indicator(ind, source) for ind in indicators_in_item)
+
+            except Exception as parse_err:
+                print(f"Warning: Failed to parse STIX object: {parse_err}. Object: {item}")
+                continue # Skip this object
+        return simple_indicators
+
+    def get_indicators(self, match_type=None, added_after=None, strict=False):
+        """Fetch indicators from the configured collection, handling pagination.
+
+        match_type and added_after (ISO 8601 timestamp or datetime) are sent to the server as
+        match[type] / added_after filters so fewer objects come over the wire.
+        strict=True validates every object with stix2 instead of the dict fast path.
+        """
         if not self.api_root_url or not self.collection_title:
             print("Error: API Root URL or Collection Title not configured.")
             return []
 
         # 1. Find the collection ID using the title
-        collection_id = self._get_collection_id_by_title(self.collection_title)
+        collection_id = self._resolve_collection_id()
         if not collection_id:
             return [] # Error message printed in helper
 
+        return self._fetch_collection_all_pages(collection_id, self.collection_title,
+                                                match_type, added_after, strict)
+
+    def _fetch_collection_all_pages(self, collection_id, collection_title, match_type=None,
+                                    added_after=None, strict=False):
+        """Page through one collection's objects; errors are printed and end the paging."""
         objects_url_base = f"{self.api_root_url}/collections/{collection_id}/objects/"
         all_simple_indicators = []
         page = 1 # Server pagination seems to be 1-based from example URLs, but code uses 0-based skip. Let's assume API uses ?page=1, ?page=2...
+        next_token = None
         more = True
 
-        print(f"Fetching indicators from {objects_url_base} for collection '{self.collection_title}' (ID: {collection_id})")
+        print(f"Fetching indicators from {objects_url_base} for collection '{collection_title}' (ID: {collection_id})")
+        # Lets the server answer 304 when nothing was added since the last poll. Left to
+        # the HTTP cache when it is on, which sends its own validators and would
+        # otherwise turn the 304 into the stale cached page.
+        conditional_headers = {} if self._http_cache_dir else self._if_modified_since(added_after)
 
         while more:
-            objects_url = f"{objects_url_base}?page={page}" # Adjust if server uses 0-based page or offset
+            objects_url = self._objects_url(objects_url_base, page, match_type, added_after, next_token)
             print(f"Requesting: {objects_url}")
+            response = None # Only this page's response may be read for error details
             try:
-                response = requests.get(objects_url, auth=self.auth, headers=self.headers, timeout=60)
-                response.raise_for_status()
-                envelope = response.json()
-
-                # Server wraps objects in an envelope: {"more": bool, "next": id|null, "objects": [bundle]}
-                # Note: data_handling.py -> create_envelope wraps the list itself: "objects": [[bundle1, bundle2]]
-                # Let's assume it's "objects": [bundle1, bundle2] as that's more standard. Adjust if needed.
-                stix_bundles_or_objects = envelope.get('objects', [])
-
-                # Check if the structure is [[obj1, obj2]] or [obj1, obj2]
-                if stix_bundles_or_objects and isinstance(stix_bundles_or_objects[0], list):
-                     # It's the [[obj1, obj2]] structure from create_envelope
-                     stix_bundles_or_objects = stix_bundles_or_objects[0]
-
-
-                if not stix_bundles_or_objects:
+                # Stream the page so objects are converted as they arrive instead of
+                # materializing the whole envelope first
+                with self.session.get(objects_url, headers=conditional_headers, timeout=self._timeout, stream=True) as response:
+                    if response.status_code == 304:
+                        print(f"Page {page} not modified since {added_after}.")
+                        break
+                    if not response.ok:
+                        response.content # Read the error body before the stream is closed
+                    response.raise_for_status()
+                    response.raw.decode_content = True # Decompress as ijson reads, no full-body copy
+                    envelope = {}
+                    received = 0
+                    for item in self._iter_envelope_objects(response.raw, envelope):
+                        received += 1
+                        all_simple_indicators.extend(self._indicators_from_items([item], strict, collection_title))
+
+                if not received:
                     print(f"No objects found on page {page}.")
                     more = False
                     continue
 
-                print(f"Received {len(stix_bundles_or_objects)} STIX object(s)/bundle(s) on page {page}.")
-
-                for item in stix_bundles_or_objects:
-                    try:
-                        # Parse the item. It could be a Bundle or a single SDO.
-                        stix_object = parse(item, allow_custom=True)
-
-                        indicators_in_item = []
-                        if isinstance(stix_object, Bundle):
-                            # If it's a bundle, filter for indicators within it
-                            indicators_in_item = stix_object.objects.filter([
-                                Filter('type', '=', 'indicator')
-                            ])
-                        elif stix_object.get('type') == 'indicator':
-                            # If it's a single indicator object directly
-                            indicators_in_item = [stix_object]
-
-                        # Format the found indicators
-                        for ind in indicators_in_item:
-                            # Use pattern for value if value attribute doesn't exist (common for STIX indicators)
-                            value = ind.get('pattern')
-                            if hasattr(ind, 'value'): # Check if 'value' exists (less common for indicators)
-                                value = ind.value
-
-                            simple_indicators.append({
-                                'id': ind.id, # Include ID for details link
-                                'type': ind.type,
-                                'value': value,
-                                'description': ind.description if hasattr(ind, 'description') else '',
-                                # Use 'valid_from' as 'first_seen' if 'last_seen' isn't present
-                                'first_seen': ind.valid_from.strftime('%Y-%m-%d %H:%M:%S') if hasattr(ind, 'valid_from') and ind.valid_from else 'N/A',
-                                'last_seen': ind.last_seen.strftime('%Y-%m-%d %H:%M:%S') if hasattr(ind, 'last_seen') and ind.last_seen else 'N/A',
-                                'created': ind.created.strftime('%Y-%m-%d %H:%M:%S') if hasattr(ind, 'created') and ind.created else '',
-                                'modified': ind.modified.strftime('%Y-%m-%d %H:%M:%S') if hasattr(ind, 'modified') and ind.modified else '',
-                                'source': self.collection_title # Use title for display
-                            })
-
-                    except Exception as parse_err:
-                        print(f"Warning: Failed to parse STIX object: {parse_err}. Object: {item}")
-                        continue # Skip this object
+                print(f"Received {received} STIX object(s)/bundle(s) on page {page}.")
 
                 # Check pagination
                 more = envelope.get('more', False)
                 if more:
                     page += 1
+                    next_token = envelope.get('next')
                 else:
                     print("No more pages indicated by server.")
 
             except requests.exceptions.RequestException as e:
                 print(f"Error fetching objects from {objects_url}: {str(e)}")
-                try:
-                    error_details = response.json()
-                    print(f"Server error details: {json.dumps(error_details, indent=2)}")
-                except (json.JSONDecodeError, AttributeError):
-                    pass
+                if response is not None:
+                    try:
+                        error_details = response.json()
+                        print(f"Server error details: {json.dumps(error_details, indent=2)}")
+                    except (ValueError, RuntimeError): # Not JSON, or the streamed body is already consumed
+                        pass
                 more = False # Stop pagination on error
-            except json.JSONDecodeError:
-                print(f"Error: Could not decode JSON response from {objects_url}")
-                print(f"Response text: {response.text}")
+            except ijson.JSONError as e:
+                print(f"Error: Could not decode JSON response from {objects_url}: {str(e)}")
                 more = False # Stop pagination on error
             except Exception as e:
                 print(f"An unexpected error occurred during indicator fetching: {str(e)}")
@@ -209,88 +631,204 @@ class TAXIIClient:
         print(f"Fetched a total of {len(all_simple_indicators)} indicators.")
         return all_simple_indicators
 
-    def get_indicator_by_id(self, indicator_id):
-        """Fetch a single indicator by its ID."""
+    def get_all_indicators(self, collection_titles, match_type=None, added_after=None, strict=False):
+        """Fetch several collections of this API Root concurrently, returned as {title: indicators}.
+
+        The collections are resolved with one /collections/ request and paged on up
+        to COLLECTION_FETCH_WORKERS threads sharing the pooled session. Titles not
+        found at the API Root are reported and left out.
+        """
+        if not self.api_root_url:
+            print("Error: API Root URL not configured.")
+            return {}
+
+        titles = list(dict.fromkeys(collection_titles))
+        collection_ids = self._get_collection_ids_by_titles(titles)
+        if collection_ids is None:
+            return {} # Error message printed in helper
+        for title in titles:
+            if title not in collection_ids:
+                print(f"Warning: Collection with title '{title}' not found at {self.api_root_url}")
+        if not collection_ids:
+            return {}
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(COLLECTION_FETCH_WORKERS, len(collection_ids))) as executor:
+            futures = {
+                executor.submit(self._fetch_collection_all_pages, collection_id, title,
+                                match_type, added_after, strict): title
+                for title, collection_id in collection_ids.items()
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        return results
+
+    async def _fetch_envelope(self, http_client, objects_url):
+        """GET one objects page, backing off on 429 as told by Retry-After.
+
+        Returns its raw body and X-TAXII-Date-Added-Last header (None when the server omits it).
+        """
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            print(f"Requesting: {objects_url}")
+            response = await http_client.get(objects_url, headers=self.headers, timeout=60)
+            if response.status_code == 429 and attempt < MAX_RATE_LIMIT_RETRIES:
+                try:
+                    delay = float(response.headers.get('Retry-After', ''))
+                except ValueError: # Missing, or an HTTP date
+                    delay = 0.5 * 2 ** attempt
+                await asyncio.sleep(min(delay, MAX_RETRY_AFTER))
+                continue
+            response.raise_for_status()
+            return response.content, response.headers.get('X-TAXII-Date-Added-Last')
+
+    async def fetch_indicators(self, http_client, match_type=None, added_after=None,
+                               process_parse_min_bytes=None):
+        """Async counterpart of get_indicators using a shared httpx.AsyncClient.
+
+        Servers paginating by ?page= get up to PREFETCH_PAGES pages requested
+        ahead of the one being parsed. Servers that hand out 'next' tokens are
+        followed one page at a time. When process_parse_min_bytes is set, pages
+        at least that large are parsed in a worker process while the next ones
+        download; smaller ones are cheaper to parse in place. Unlike
+        get_indicators, HTTP and decoding errors are raised so the caller can
+        report them per feed.
+
+        Returns (indicators, date_added_last): the newest X-TAXII-Date-Added-Last
+        of the pages, the server's added_after cursor for the next fetch, or None
+        if the server didn't send one.
+        """
         if not self.api_root_url or not self.collection_title:
-             print("Error: API Root URL or Collection Title not configured.")
-             return None
+            raise ValueError("API Root URL or Collection Title not configured.")
 
-        collection_id = self._get_collection_id_by_title(self.collection_title)
+        # Collection lookup is cached, run it off the event loop on a miss
+        loop = asyncio.get_running_loop()
+        collection_id = await loop.run_in_executor(None, self._resolve_collection_id)
         if not collection_id:
-            return None
+            raise ValueError(f"Could not list collections at {self.api_root_url}") # Details printed by the helper
 
-        object_url = f"{self.api_root_url}/collections/{collection_id}/objects/{indicator_id}/"
-        print(f"Requesting indicator details: {object_url}")
+        objects_url_base = f"{self.api_root_url}/collections/{collection_id}/objects/"
+        all_simple_indicators = []
+        date_added_last = None
+
+        def page_url(page, next_token=None):
+            return self._objects_url(objects_url_base, page, match_type, added_after, next_token)
+
+        async def parse_page(fetched):
+            nonlocal date_added_last
+            content, page_date_added_last = fetched
+            date_added_last = _newest_timestamp((date_added_last, page_date_added_last))
+            if process_parse_min_bytes is not None and len(content) >= process_parse_min_bytes:
+                parsed = await loop.run_in_executor(_get_parse_pool(), _parse_page_bytes, content,
+                                                    self.collection_title)
+            else:
+                parsed = _parse_page_bytes(content, self.collection_title)
+            all_simple_indicators.extend(parsed['indicators'])
+            if parsed['unparsed']:
+                # Items the fast path could not read get full stix2 parsing here
+                all_simple_indicators.extend(self._indicators_from_items(parsed['unparsed'], strict=True))
+            return parsed
+
+        # Page 1 on its own tells us how the server paginates
+        envelope = await parse_page(await self._fetch_envelope(http_client, page_url(1)))
+        page = 1
+        in_flight = {} # page number -> task, for pages requested ahead
+        try:
+            while True:
+                if not envelope['count'] or not envelope['more']:
+                    break # Pages requested past the end are cancelled below
+
+                page += 1
+                next_token = envelope['next']
+                if next_token:
+                    # Token pagination: the next URL depends on this response
+                    envelope = await parse_page(
+                        await self._fetch_envelope(http_client, page_url(page, next_token)))
+                    continue
 
+                # Keep a sliding window of pages in flight, they keep downloading while this one is parsed
+                for ahead in range(page, page + PREFETCH_PAGES):
+                    if ahead not in in_flight:
+                        in_flight[ahead] = asyncio.create_task(
+                            self._fetch_envelope(http_client, page_url(ahead)))
+                envelope = await parse_page(await in_flight.pop(page))
+        finally:
+            for task in in_flight.values():
+                task.cancel()
+            # Collect the cancelled/failed speculative pages so their errors aren't reported
+            await asyncio.gather(*in_flight.values(), return_exceptions=True)
+
+        print(f"Fetched a total of {len(all_simple_indicators)} indicators from '{self.collection_title}'.")
+        return all_simple_indicators, date_added_last
+
+    @classmethod
+    def _id_batches(cls, objects_url_base, ids):
+        """Split ids into comma-joined match[id] groups that fit MATCH_ID_URL_BUDGET."""
+        base_length = len(cls._objects_url(objects_url_base, 1, match_id='-'))
+        batch, length = [], base_length
+        for indicator_id in ids:
+            extra = len(indicator_id) + (1 if batch else 0) # One comma between ids
+            if batch and length + extra > MATCH_ID_URL_BUDGET:
+                yield batch
+                batch, length, extra = [], base_length, len(indicator_id)
+            batch.append(indicator_id)
+            length += extra
+        if batch:
+            yield batch
+
+    def _matching_indicators(self, envelope, wanted):
+        """{id: raw STIX indicator dict} for the indicators of one envelope whose id is in wanted."""
+        # Objects may come bare or wrapped in bundles, same as the paged listing
+        found = {}
+        for item in _envelope_items(envelope):
+            if not isinstance(item, dict):
+                continue
+            objects = item.get('objects', []) if item.get('type') == 'bundle' else [item]
+            for obj in objects:
+                if isinstance(obj, dict) and obj.get('type') == 'indicator' and obj.get('id') in wanted:
+                    found[obj['id']] = obj
+        return found
+
+    def _fetch_id_batch(self, objects_url_base, batch):
+        """Fetch one match[id] batch through all its pages, returning {id: raw STIX indicator dict}."""
+        wanted = set(batch)
+        found = {}
+        page = 1
+        next_token = None
+        while True:
+            object_url = self._objects_url(objects_url_base, page, next_token=next_token, match_id=','.join(batch))
+            print(f"Requesting indicator details: {object_url}")
+            try:
+                response = self.session.get(object_url, timeout=self._timeout)
+                if response.status_code == 404:
+                    break # No (more) objects matched
+                response.raise_for_status()
+                envelope = _loads(response.content)
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching indicators {', '.join(batch)}: {str(e)}")
+                break
+            except json.JSONDecodeError:
+                print(f"Error: Could not decode JSON response from {object_url}")
+                print(f"Response text: {response.text}")
+                break
+
+            found.update(self._matching_indicators(envelope, wanted))
+            if len(found) == len(wanted) or not envelope.get('more', False):
+                break
+            page += 1
+            next_token = envelope.get('next')
+        return found
+
+    def _fetch_object_by_id(self, objects_url_base, indicator_id):
+        """Raw STIX dict of one indicator from the spec's objects/{id}/ endpoint, or None."""
+        object_url = f"{objects_url_base}{indicator_id}/"
+        print(f"Requesting indicator details: {object_url}")
         try:
-            response = requests.get(object_url, auth=self.auth, headers=self.headers, timeout=30)
+            response = self.session.get(object_url, timeout=self._timeout)
+            if response.status_code == 404:
+                print(f"Indicator {indicator_id} not found at {object_url} (404)")
+                return None
             response.raise_for_status()
-            stix_data = response.json() # Server returns the object directly here (likely wrapped in list/envelope still?)
-
-            # DataHandler.get_api_root_collections_object_by_id returns an envelope like get_objects
-            # Let's assume the same envelope structure: {"objects": [[stix_object]]}
-            objects_list = stix_data.get('objects', [])
-            if objects_list and isinstance(objects_list[0], list):
-                 stix_item = objects_list[0][0] if objects_list[0] else None
-            elif objects_list: # Should be [stix_object]
-                 stix_item = objects_list[0]
-            else:
-                 stix_item = None
-
-
-            if not stix_item:
-                 print(f"Indicator {indicator_id} not found or empty response from {object_url}")
-                 return None
-
-            # Parse the STIX object (could be a bundle containing the indicator)
-            stix_object = parse(stix_item, allow_custom=True)
-
-            target_indicator = None
-            if isinstance(stix_object, Bundle):
-                 # Find the indicator within the bundle
-                 for obj in stix_object.objects:
-                     if obj.id == indicator_id and obj.type == 'indicator':
-                         target_indicator = obj
-                         break
-            elif stix_object.id == indicator_id and stix_object.type == 'indicator':
-                 target_indicator = stix_object
-
-            if target_indicator:
-                 # Format the indicator (reuse formatting logic)
-                 value = target_indicator.get('pattern')
-                 if hasattr(target_indicator, 'value'):
-                     value = target_indicator.value
-
-                 # Return the full STIX object as dict for details view
-                 # return target_indicator.serialize(pretty=False) # Return full STIX JSON
-                 # Or return the simplified format if preferred
-                 return {
-                    'id': target_indicator.id,
-                    'raw': target_indicator.serialize(pretty=True), # Add raw STIX for display
-                    'type': target_indicator.type,
-                    'value': value,
-                    'description': target_indicator.description if hasattr(target_indicator, 'description') else '',
-                    'first_seen': target_indicator.valid_from.strftime('%Y-%m-%d %H:%M:%S') if hasattr(target_indicator, 'valid_from') and target_indicator.valid_from else 'N/A',
-                    'last_seen': target_indicator.last_seen.strftime('%Y-%m-%d %H:%M:%S') if hasattr(target_indicator, 'last_seen') and target_indicator.last_seen else 'N/A',
-                    'created': target_indicator.created.strftime('%Y-%m-%d %H:%M:%S') if hasattr(target_indicator, 'created') and target_indicator.created else '',
-                    'modified': target_indicator.modified.strftime('%Y-%m-%d %H:%M:%S') if hasattr(target_indicator, 'modified') and target_indicator.modified else '',
-                    'source': self.collection_title
-                 }
-            else:
-                 print(f"Indicator object with ID {indicator_id} not found within the response from {object_url}")
-                 return None
-
-        except requests.exceptions.HTTPError as e:
-             if e.response.status_code == 404:
-                 print(f"Indicator {indicator_id} not found at {object_url} (404)")
-             else:
-                 print(f"HTTP error fetching indicator {indicator_id}: {str(e)}")
-                 try:
-                    error_details = response.json()
-                    print(f"Server error details: {json.dumps(error_details, indent=2)}")
-                 except (json.JSONDecodeError, AttributeError):
-                    pass
-             return None
+            envelope = _loads(response.content)
         except requests.exceptions.RequestException as e:
             print(f"Error fetching indicator {indicator_id}: {str(e)}")
             return None
@@ -298,8 +836,62 @@ class TAXIIClient:
             print(f"Error: Could not decode JSON response from {object_url}")
             print(f"Response text: {response.text}")
             return None
-        except Exception as e:
-            print(f"An unexpected error occurred fetching indicator {indicator_id}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
\ No newline at end of file
+        return self._matching_indicators(envelope, {indicator_id}).get(indicator_id)
+
+    @staticmethod
+    def _run_concurrently(fn, items):
+        """list(map(fn, items)), on up to ID_BATCH_WORKERS threads when there is more than one item."""
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        # The pooled session is shared by the worker threads
+        with ThreadPoolExecutor(max_workers=min(ID_BATCH_WORKERS, len(items))) as executor:
+            return list(executor.map(fn, items))
+
+    def _indicator_details(self, obj):
+        """Simplified indicator plus the pretty-printed STIX for the details view."""
+        stix_object = parse(obj, allow_custom=True)
+        projected = _project_indicator(obj, self.collection_title)
+        details = projected[0] if projected else self._simplify_indicator(stix_object)
+        details['raw'] = stix_object.serialize(pretty=True)
+        return details
+
+    def get_indicators_by_ids(self, ids):
+        """Fetch several indicators with batched match[id] requests, returned as {id: details}.
+
+        A single id, and any id a batch did not return (servers without match[id]
+        support), is fetched from the objects/{id}/ endpoint. Ids that are not
+        found are left out of the result.
+        """
+        if not self.api_root_url or not self.collection_title:
+             print("Error: API Root URL or Collection Title not configured.")
+             return {}
+
+        collection_id = self._resolve_collection_id()
+        if not collection_id:
+            return {}
+
+        objects_url_base = f"{self.api_root_url}/collections/{collection_id}/objects/"
+        ids = list(dict.fromkeys(ids))
+        found = {}
+        if len(ids) > 1:
+            batches = list(self._id_batches(objects_url_base, ids))
+            for batch_found in self._run_concurrently(
+                    lambda batch: self._fetch_id_batch(objects_url_base, batch), batches):
+                found.update(batch_found)
+        missing = [indicator_id for indicator_id in ids if indicator_id not in found]
+        for indicator_id, obj in zip(missing, self._run_concurrently(
+                lambda indicator_id: self._fetch_object_by_id(objects_url_base, indicator_id), missing)):
+            if obj is not None:
+                found[indicator_id] = obj
+
+        results = {}
+        for indicator_id, obj in found.items():
+            try:
+                results[indicator_id] = self._indicator_details(obj)
+            except Exception as parse_err:
+                print(f"Warning: Failed to parse STIX object: {parse_err}. Object: {obj}")
+        return results
+
+    def get_indicator_by_id(self, indicator_id):
+        """Fetch a single indicator by its ID, from the objects/{id}/ endpoint."""
+        return self.get_indicators_by_ids([indicator_id]).get(indicator_id)
@@ -0,0 +1,4 @@
+# Entry point for gunicorn, see Procfile.
+# Run with the threaded worker (-k gthread): the refresh uses asyncio and
+# worker threads, which gevent's monkey patching does not support reliably.
+from app import app  # noqa: F401